@@ -0,0 +1,123 @@
+# encoding: utf8
+# date: 2025-02-24
+
+"""对问题的选项顺序进行排列，扩充测试题，用于测试模型对选项位置的偏好
+
+每个问题按照固定的随机种子生成K种选项顺序，第0种为questions.json中的原始顺序。
+“以上选项均不满足题意”始终作为最后一个选项。问题以生成器的形式逐个产生，callapi逐条写入结果，
+不需要在内存中保存扩充后的全部问题和结果。
+由于最后一个选项不参与排列，有3个可排列选项的问题最多6种排列，有4个的最多24种，
+K=24时问题数量从385扩充到2588（约6.7倍）。
+"""
+
+import config
+import hashlib
+import math
+import random
+from string import ascii_uppercase
+from typing import Any, Iterable, Iterator
+
+def distinct_arrangements(values: list[str]) -> int:
+    """计算选项文本不同的排列数，重复的选项文本交换位置后不算新的排列
+
+    Args:
+        values (list[str]): 选项文本
+
+    Returns:
+        int: 不同的排列数
+    """
+    total: int = math.factorial(len(values))
+    for value in set(values):
+        total //= math.factorial(values.count(value))
+    return total
+
+def option_permutations(values: list[str], k: int, seed: str) -> list[tuple[int, ...]]:
+    """生成确定的k种选项排列，排列后的选项文本互不相同
+
+    Args:
+        values (list[str]): 需要排列的选项文本
+        k (int): 排列数，超过不同的排列数时取全部排列
+        seed (str): 随机种子
+
+    Returns:
+        list[tuple[int, ...]]: 排列列表，第一个为原始顺序
+    """
+    n: int = len(values)
+    k = min(k, distinct_arrangements(values))
+    # 使用哈希值作为种子，保证每次运行的结果相同
+    rng = random.Random(int(hashlib.sha256(seed.encode("utf8")).hexdigest(), 16))
+    identity: tuple[int, ...] = tuple(range(n))
+    permutations: list[tuple[int, ...]] = [identity]
+    # 按照排列后的选项文本去重，避免选项文本重复的问题产生相同的题目
+    seen: set[tuple[str, ...]] = {tuple(values)}
+    while len(permutations) < k:
+        permutation = tuple(rng.sample(range(n), n))
+        arranged = tuple(values[i] for i in permutation)
+        if arranged not in seen:
+            seen.add(arranged)
+            permutations.append(permutation)
+    return permutations
+
+def permute_question(item: dict[str, Any], k: int) -> Iterator[dict[str, Any]]:
+    """生成问题的k种选项排列
+
+    Args:
+        item (dict[str, Any]): 问题
+        k (int): 排列数
+
+    Yields:
+        Iterator[dict[str, Any]]: 重新排列选项后的问题，答案随选项重新对应
+    """
+    letters: list[str] = list(item[config.OPTIONS])
+    # “以上选项均不满足题意”不参与排列
+    last: str = letters[-1]
+    movable: list[str] = letters[:-1] if item[config.OPTIONS][last] == config.not_satisfy else letters
+    seed = f"{item[config.DOMAIN]}-{item[config.KIND]}-{item[config.ID]}"
+    values: list[str] = [item[config.OPTIONS][letter] for letter in movable]
+    for permutation_id, permutation in enumerate(option_permutations(values, k, seed)):
+        # 新选项字母 -> 原选项字母
+        mapping: dict[str, str] = {ascii_uppercase[i]: movable[j] for i, j in enumerate(permutation)}
+        mapping |= {letter: letter for letter in letters[len(movable):]}
+        options: dict[str, str] = {new: item[config.OPTIONS][old] for new, old in mapping.items()}
+        answer: list[str] = [new for new, old in mapping.items() if old in item[config.ANSWER]]
+        yield {
+            config.DOMAIN: item[config.DOMAIN],
+            config.ID: item[config.ID],
+            config.PERMUTATION: permutation_id,
+            config.QUESTION: item[config.QUESTION],
+            config.OPTIONS: options,
+            config.ANSWER: answer,
+            config.KIND: item[config.KIND],
+            config.QUESTION_INFO: item[config.QUESTION_INFO],
+        }
+
+def augmented_questions(questions: Iterable[dict[str, Any]], k: int) -> Iterator[dict[str, Any]]:
+    """逐个生成扩充后的问题
+
+    Args:
+        questions (Iterable[dict[str, Any]]): 原始问题
+        k (int): 每个问题的排列数
+
+    Yields:
+        Iterator[dict[str, Any]]: 扩充后的问题
+    """
+    for item in questions:
+        yield from permute_question(item, k)
+
+def count_questions(questions: Iterable[dict[str, Any]], k: int) -> int:
+    """计算扩充后的问题数量
+
+    Args:
+        questions (Iterable[dict[str, Any]]): 原始问题
+        k (int): 每个问题的排列数
+
+    Returns:
+        int: 扩充后的问题数量
+    """
+    total: int = 0
+    for item in questions:
+        values: list[str] = list(item[config.OPTIONS].values())
+        if values[-1] == config.not_satisfy:
+            values = values[:-1]
+        total += min(k, distinct_arrangements(values))
+    return total
@@ -5,11 +5,13 @@
 """
 
 import config
+import response_store
 import requests
 from tqdm import tqdm
 import concurrent.futures
-from typing import Any
+from typing import Any, Iterable, Iterator
 import json
+import textwrap
 from pathlib import Path
 import time
 import random
@@ -83,50 +85,103 @@ def result_arrange(input: dict[str, Any], result: dict[str, Any]) -> dict[str, A
     return {
         config.DOMAIN : input[config.DOMAIN],
         config.ID : input[config.ID],
+        config.PERMUTATION : input.get(config.PERMUTATION, 0),
         config.QUESTION : input[config.QUESTION],
         config.OPTIONS : input[config.OPTIONS],
         config.ANSWER : input[config.ANSWER],
-        config.RESPONSE : model_response,
+        config.RESPONSE_HASH : response_store.save_response(model_response),
         config.TIME : result[config.TIME],
         config.KIND : input[config.KIND],
         config.QUESTION_INFO : input[config.QUESTION_INFO],
     }
 
-def call_model(model_name: str, items: list[dict[str, Any]]) -> list[dict[str, Any]]:
-    """对大模型API进行多次调用，对问题进行测试
+def arrange_results(model_name: str, items: Iterable[dict[str, Any]], total: int | None = None) -> Iterator[dict[str, Any]]:
+    """逐个调用大模型API，产生整理后的结果
 
     Args:
         model_name (str): 模型名称
-        items (list[dict[str, Any]]): 问题列表
+        items (Iterable[dict[str, Any]]): 问题列表或问题生成器
+        total (int | None, optional): 问题数量，用于显示进度
 
-    Returns:
-        list[dict[str, Any]]: 答案列表
+    Yields:
+        Iterator[dict[str, Any]]: 整理后的结果
     """
-    results: list[dict[str, Any]] = []
-    for item in tqdm(items, desc=f"调用模型: {model_name}"):
+    for item in tqdm(items, desc=f"调用模型: {model_name}", total=total):
         # 单次调用API
         question: str = item["question"]
         options: dict[str, str] = item["options"]
         result = call_api(model_name, question, options)
-        arranged_result = result_arrange(item, result)
-        results.append(arranged_result)
+        yield result_arrange(item, result)
         # 添加随机休眠
         time.sleep(random.random())
-    # return results
-    with open(Path(config.res_dir) / f"{model_name}.json", "w", encoding="utf8") as f:
-        json.dump(results, f, ensure_ascii=False, indent=4)
 
-def main():
+def write_results(json_file: Path, results: Iterable[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+    """将结果逐条写入json文件，并原样产生每条结果
+
+    写入的格式与json.dump(results, f, ensure_ascii=False, indent=4)相同，不需要在内存中保存全部结果。
+
+    Args:
+        json_file (Path): json文件路径
+        results (Iterable[dict[str, Any]]): 结果
+
+    Yields:
+        Iterator[dict[str, Any]]: 已写入的结果
+    """
+    with json_file.open("w", encoding="utf8") as f:
+        f.write("[")
+        written: bool = False
+        for result in results:
+            f.write(",\n" if written else "\n")
+            f.write(textwrap.indent(json.dumps(result, ensure_ascii=False, indent=4), "    "))
+            written = True
+            yield result
+        f.write("\n]" if written else "]")
+
+def call_model(model_name: str, items: Iterable[dict[str, Any]], total: int | None = None) -> None:
+    """对大模型API进行多次调用，对问题进行测试，并逐条保存结果
+
+    Args:
+        model_name (str): 模型名称
+        items (Iterable[dict[str, Any]]): 问题列表或问题生成器
+        total (int | None, optional): 问题数量，用于显示进度
+    """
+    results = write_results(Path(config.res_dir) / f"{model_name}.json", arrange_results(model_name, items, total))
+    if config.use_database:
+        import database
+        database.save_run(model_name, results)
+    else:
+        for _ in results:
+            pass
+
+def main(model_names: list[str] | None = None, permutations: int | None = None) -> None:
     """主函数
+
+    Args:
+        model_names (list[str] | None, optional): 需要测试的模型，默认为config.MODEL_NAMES
+        permutations (int | None, optional): 每个问题的选项排列数，默认为config.permutations
     """
+    if model_names is None:
+        model_names = config.MODEL_NAMES
+    if permutations is None:
+        permutations = config.permutations
     # 读取json文件
     with open(config.json_path, "r", encoding="utf8") as f:
         data: list[dict[str, Any]] = json.load(f)
     # 创建线程池
     with concurrent.futures.ThreadPoolExecutor() as executor:
         # 多线程调用
-        for model_name in config.MODEL_NAMES:
-            executor.submit(call_model, model_name, data)
+        futures: list[concurrent.futures.Future] = []
+        for model_name in model_names:
+            if permutations > 1:
+                # 每个线程使用各自的生成器逐个产生扩充后的问题，结果也逐条写入文件
+                import augment
+                items = augment.augmented_questions(data, permutations)
+                futures.append(executor.submit(call_model, model_name, items, augment.count_questions(data, permutations)))
+            else:
+                futures.append(executor.submit(call_model, model_name, data))
+        # 获取结果，使线程中的异常能够抛出
+        for future in futures:
+            future.result()
     """
     # 转为字典
     result_dict: dict[str, list] = {model_name: results for model_name, results in zip(config.MODEL_NAMES, results_list)}
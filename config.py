@@ -43,6 +43,8 @@ middle_phrase = r"V上N来"
 post_phrase = r"V上来N"
 subject_phrase1 = r"NV上来-1"
 subject_phrase2 = r"NV上来-2"
+## 统计时按照格式划分的领域
+domain_forms = [r"VN上来", r"V上N来", r"V上来N", r"NV上来"]
 judge = r"-正误"
 pre_sentence = r"VN上来-全句"
 middle_sentence = r"V上N来-全句"
@@ -70,9 +72,11 @@ VERB_TYPE = "verb_type"
 NOUN_ROLE = "noun_role"
 NOUN_TYPE = "noun_type"
 RESPONSE = "response"
+RESPONSE_HASH = "response_hash"
 EXTRACTED_ANSWER = "extracted_answer"
 TIME = "time"
 JUDGE = "judge"
+PERMUTATION = "permutation"
 
 # 提问的问题
 ## 替换符
@@ -83,6 +87,8 @@ sentence_question = r"以下选项中语法、语义正确的是_____"
 meaning_question = r"以下选项中与“[replace]”意思一样的是_____"
 ## 以上选项均不满足题意
 not_satisfy = r"以上选项均不满足题意"
+## 每个问题的选项排列数，为1时只使用原始顺序
+permutations = 1
 
 # api文件
 api_file = r"config/api.txt"
@@ -104,6 +110,12 @@ res_dir = r"result"
 url = "https://api.zhizengzeng.com/v1/chat/completions"
 # 提取结果的目录
 extracted_dir = r"extracted"
+# 模型回复的存储目录
+response_dir = r"responses"
+# 是否同时将结果写入SQLite数据库，并在后处理时从数据库中统计
+use_database = False
+# 数据库文件的路径
+db_path = r"results.db"
 
 # 结果文件
 RESULT_FILE = r"“上来”测试题模型结果.xlsx"
\ No newline at end of file
@@ -0,0 +1,414 @@
+# encoding: utf8
+# date: 2025-02-17
+
+"""结果数据库
+
+可选的SQLite存储，在config.use_database为True时启用。数据库包含以下表：
+- questions: 问题及问题信息
+- runs: 每次调用模型API的记录
+- responses: 每次调用中模型对每个问题（及其选项排列）的回复（回复文本保存在response_store中）
+- extractions: 从回复中提取的答案及是否正确
+统计时直接在数据库中聚合，不需要读取全部结果。
+"""
+
+import config
+import hashlib
+import json
+import sqlite3
+import time
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+# 问题信息在数据库中的列名
+INFO_COLUMNS: dict[str, str] = {
+    config.verb: config.VERB,
+    config.verb_type: config.VERB_TYPE,
+    config.noun_role: config.NOUN_ROLE,
+    config.noun_type: config.NOUN_TYPE,
+}
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS questions (
+    domain TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    question TEXT NOT NULL,
+    options TEXT NOT NULL,
+    answer TEXT NOT NULL,
+    {config.VERB} TEXT,
+    {config.VERB_TYPE} TEXT,
+    {config.NOUN_ROLE} TEXT,
+    {config.NOUN_TYPE} TEXT,
+    PRIMARY KEY (domain, kind, id)
+);
+CREATE INDEX IF NOT EXISTS idx_questions_verb ON questions ({config.VERB});
+CREATE INDEX IF NOT EXISTS idx_questions_verb_type ON questions ({config.VERB_TYPE});
+CREATE INDEX IF NOT EXISTS idx_questions_noun_role ON questions ({config.NOUN_ROLE});
+CREATE INDEX IF NOT EXISTS idx_questions_noun_type ON questions ({config.NOUN_TYPE});
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    model TEXT NOT NULL,
+    created REAL NOT NULL,
+    source TEXT,
+    fingerprint TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_model ON runs (model);
+CREATE TABLE IF NOT EXISTS responses (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    model TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    permutation INTEGER NOT NULL,
+    response_hash TEXT NOT NULL,
+    time REAL NOT NULL,
+    PRIMARY KEY (run_id, domain, kind, id, permutation)
+);
+CREATE INDEX IF NOT EXISTS idx_responses_model ON responses (model, domain, kind, id);
+CREATE TABLE IF NOT EXISTS extractions (
+    run_id INTEGER NOT NULL REFERENCES runs (run_id),
+    model TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    permutation INTEGER NOT NULL,
+    extracted_answer TEXT NOT NULL,
+    correct INTEGER NOT NULL,
+    PRIMARY KEY (run_id, domain, kind, id, permutation)
+);
+CREATE INDEX IF NOT EXISTS idx_extractions_model ON extractions (model, domain, kind, id);
+"""
+
+def connect() -> sqlite3.Connection:
+    """连接数据库，不存在时创建
+
+    Returns:
+        sqlite3.Connection: 数据库连接
+    """
+    # callapi和extract在多个线程中写入，等待其他线程的事务完成
+    conn = sqlite3.connect(config.db_path, timeout=60)
+    conn.executescript(SCHEMA)
+    # 旧数据库的runs表缺少来源和指纹列
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(runs)")}
+    for column in ["source", "fingerprint"]:
+        if column not in columns:
+            conn.execute(f"ALTER TABLE runs ADD COLUMN {column} TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_fingerprint ON runs (model, fingerprint)")
+    return conn
+
+def insert_questions(conn: sqlite3.Connection, questions: list[dict[str, Any]]) -> None:
+    """在当前事务中写入问题，已有的问题会被替换
+
+    Args:
+        conn (sqlite3.Connection): 数据库连接
+        questions (list[dict[str, Any]]): 问题列表
+    """
+    rows = [
+        (
+            q[config.DOMAIN], q[config.KIND], q[config.ID], q[config.QUESTION],
+            json.dumps(q[config.OPTIONS], ensure_ascii=False), json.dumps(q[config.ANSWER], ensure_ascii=False),
+        ) + tuple(q[config.QUESTION_INFO].get(k) for k in INFO_COLUMNS)
+        for q in questions
+    ]
+    conn.executemany(
+        f"INSERT OR REPLACE INTO questions VALUES (?, ?, ?, ?, ?, ?{', ?' * len(INFO_COLUMNS)})",
+        rows,
+    )
+
+def save_questions(questions: list[dict[str, Any]]) -> None:
+    """保存问题，已有的问题会被替换
+
+    Args:
+        questions (list[dict[str, Any]]): 问题列表
+    """
+    conn = connect()
+    with conn:
+        insert_questions(conn, questions)
+    conn.close()
+
+def run_fingerprint(results: Iterable[dict[str, Any]]) -> tuple[list[tuple], str]:
+    """计算一次调用的回复记录和指纹，结果只遍历一次
+
+    Args:
+        results (Iterable[dict[str, Any]]): callapi整理后的结果或extract提取后的结果
+
+    Returns:
+        tuple[list[tuple], str]: 回复记录和按照全部回复计算的指纹
+    """
+    import response_store
+    rows = [
+        (r[config.DOMAIN], r[config.KIND], r[config.ID], r.get(config.PERMUTATION, 0), response_store.get_response_hash(r), r[config.TIME])
+        for r in results
+    ]
+    fingerprint: str = hashlib.sha256(json.dumps(sorted(rows), ensure_ascii=False).encode("utf8")).hexdigest()
+    return rows, fingerprint
+
+def save_run(model_name: str, results: Iterable[dict[str, Any]], source: str = "callapi") -> int:
+    """保存一次模型调用的全部回复，并更新其中的问题
+
+    回复完全相同的调用只保存一次，重复保存时返回已有的调用记录编号。
+    结果只遍历一次，可以传入callapi逐条产生结果的生成器，内存中只保存回复记录和原始顺序的问题。
+
+    Args:
+        model_name (str): 模型名称
+        results (Iterable[dict[str, Any]]): callapi整理后的结果
+        source (str, optional): 结果的来源，默认为callapi
+
+    Returns:
+        int: 调用记录的编号
+    """
+    # 按照原始选项顺序（第0种排列）更新问题，不需要重新运行questions或db-import
+    questions: list[dict[str, Any]] = []
+    def collect_questions(results: Iterable[dict[str, Any]]) -> Iterator[dict[str, Any]]:
+        for r in results:
+            if r.get(config.PERMUTATION, 0) == 0:
+                questions.append(r)
+            yield r
+    # 用于识别重复导入的调用
+    rows, fingerprint = run_fingerprint(collect_questions(results))
+    conn = connect()
+    with conn:
+        insert_questions(conn, questions)
+    row = conn.execute("SELECT run_id FROM runs WHERE model = ? AND fingerprint = ?", (model_name, fingerprint)).fetchone()
+    if row is not None:
+        conn.close()
+        return row[0]
+    with conn:
+        run_id: int = conn.execute(
+            "INSERT INTO runs (model, created, source, fingerprint) VALUES (?, ?, ?, ?)",
+            (model_name, time.time(), source, fingerprint),
+        ).lastrowid
+        conn.executemany(
+            "INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [(run_id, model_name) + row for row in rows],
+        )
+    conn.close()
+    return run_id
+
+def matching_run(model_name: str, results: list[dict[str, Any]]) -> int:
+    """获得与已读取的结果对应的调用记录编号
+
+    Args:
+        model_name (str): 模型名称
+        results (list[dict[str, Any]]): 已读取的提取结果
+
+    Raises:
+        ValueError: 数据库中没有与结果对应的调用记录
+
+    Returns:
+        int: 调用记录的编号
+    """
+    _, fingerprint = run_fingerprint(results)
+    conn = connect()
+    row = conn.execute("SELECT run_id FROM runs WHERE model = ? AND fingerprint = ?", (model_name, fingerprint)).fetchone()
+    conn.close()
+    if row is None:
+        raise ValueError(f"数据库中没有与extracted中模型{model_name}的结果对应的调用记录，请先运行db-import")
+    return row[0]
+
+def latest_run(conn: sqlite3.Connection, model_name: str) -> int | None:
+    """获得模型最近一次调用的编号
+
+    Args:
+        conn (sqlite3.Connection): 数据库连接
+        model_name (str): 模型名称
+
+    Returns:
+        int | None: 调用记录的编号，没有记录时为None
+    """
+    row = conn.execute("SELECT MAX(run_id) FROM runs WHERE model = ?", (model_name,)).fetchone()
+    return row[0]
+
+def checked_run(conn: sqlite3.Connection, model_name: str, run_id: int | None = None) -> int:
+    """获得调用记录的编号，没有记录时报错
+
+    Args:
+        conn (sqlite3.Connection): 数据库连接
+        model_name (str): 模型名称
+        run_id (int | None, optional): 调用记录的编号，默认为最近一次调用
+
+    Raises:
+        ValueError: 数据库中没有模型的调用记录
+
+    Returns:
+        int: 调用记录的编号
+    """
+    if run_id is None:
+        run_id = latest_run(conn, model_name)
+    if run_id is None:
+        conn.close()
+        raise ValueError(f"数据库中没有模型{model_name}的调用记录，请先运行call或db-import")
+    return run_id
+
+def save_extractions(model_name: str, extracted: list[dict[str, Any]], run_id: int | None = None) -> None:
+    """保存提取的答案
+
+    Args:
+        model_name (str): 模型名称
+        extracted (list[dict[str, Any]]): extract提取后的结果
+        run_id (int | None, optional): 调用记录的编号，默认为最近一次调用
+    """
+    conn = connect()
+    run_id = checked_run(conn, model_name, run_id)
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO extractions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    run_id, model_name, e[config.DOMAIN], e[config.KIND], e[config.ID], e.get(config.PERMUTATION, 0),
+                    json.dumps(e[config.EXTRACTED_ANSWER], ensure_ascii=False),
+                    # 与postprocess.compare_lists的判断一致
+                    int(sorted(e[config.ANSWER]) == sorted(e[config.EXTRACTED_ANSWER])),
+                )
+                for e in extracted
+            ],
+        )
+    conn.close()
+
+def model_score(model_name: str, run_id: int | None = None) -> dict[str, float | str]:
+    """计算模型的分数，字段与postprocess.model_score相同
+
+    Args:
+        model_name (str): 模型名称
+        run_id (int | None, optional): 调用记录的编号，默认为最近一次调用
+
+    Returns:
+        dict[str, float | str]: 模型的分数
+    """
+    conn = connect()
+    run_id = checked_run(conn, model_name, run_id)
+    record: dict[str, float | str] = {"model": model_name}
+    # 扩充选项排列时，分数为所有排列的平均值
+    record['permutations'] = conn.execute("SELECT COUNT(DISTINCT permutation) FROM extractions WHERE run_id = ?", (run_id,)).fetchone()[0]
+    record['all'] = conn.execute("SELECT AVG(correct) FROM extractions WHERE run_id = ?", (run_id,)).fetchone()[0]
+    by_kind = dict(conn.execute("SELECT kind, AVG(correct) FROM extractions WHERE run_id = ? GROUP BY kind", (run_id,)))
+    for kind in [config.PHRASE, config.SENTENCE, config.MEANING]:
+        record[kind] = by_kind.get(kind)
+    for domain in config.domain_forms:
+        record[domain] = conn.execute(
+            "SELECT AVG(correct) FROM extractions WHERE run_id = ? AND instr(domain, ?) > 0", (run_id, domain)
+        ).fetchone()[0]
+    conn.close()
+    return record
+
+def model_time(model_name: str, run_id: int | None = None) -> dict[str, float | str]:
+    """计算模型的时间，字段与postprocess.model_time相同
+
+    Args:
+        model_name (str): 模型名称
+        run_id (int | None, optional): 调用记录的编号，默认为最近一次调用
+
+    Returns:
+        dict[str, float | str]: 模型的时间
+    """
+    conn = connect()
+    run_id = checked_run(conn, model_name, run_id)
+    record: dict[str, float | str] = {"model": model_name}
+    record['all'] = conn.execute("SELECT AVG(time) FROM responses WHERE run_id = ?", (run_id,)).fetchone()[0]
+    by_kind = dict(conn.execute("SELECT kind, AVG(time) FROM responses WHERE run_id = ? GROUP BY kind", (run_id,)))
+    for kind in [config.PHRASE, config.SENTENCE, config.MEANING]:
+        record[kind] = by_kind.get(kind)
+    conn.close()
+    return record
+
+def info_scores(model_name: str, run_id: int | None = None) -> list[dict[str, float | str | int]]:
+    """按照问题信息（动词、动词类型、名词角色、名词类型）统计模型的分数，字段与postprocess.info_scores相同
+
+    Args:
+        model_name (str): 模型名称
+        run_id (int | None, optional): 调用记录的编号，默认为最近一次调用
+
+    Returns:
+        list[dict[str, float | str | int]]: 每个问题信息取值的分数
+    """
+    conn = connect()
+    run_id = checked_run(conn, model_name, run_id)
+    records: list[dict[str, float | str | int]] = []
+    for field, column in INFO_COLUMNS.items():
+        rows = conn.execute(
+            f"""
+            SELECT questions.{column}, COUNT(*), AVG(extractions.correct)
+            FROM extractions JOIN questions
+            ON extractions.domain = questions.domain AND extractions.kind = questions.kind AND extractions.id = questions.id
+            WHERE extractions.run_id = ?
+            GROUP BY questions.{column}
+            ORDER BY questions.{column}
+            """,
+            (run_id,),
+        )
+        for value, count, score in rows:
+            records.append({"model": model_name, "field": field, "value": value, "count": count, "score": score})
+    conn.close()
+    return records
+
+def question_counts() -> list[dict[str, str | int]]:
+    """统计各领域各类型的问题数量，字段与postprocess.basic_info相同
+
+    Returns:
+        list[dict[str, str | int]]: 问题数量
+    """
+    conn = connect()
+    info: list[dict[str, str | int]] = []
+    for domain in config.domain_forms + ["all"]:
+        if domain == "all":
+            rows = conn.execute("SELECT kind, COUNT(*) FROM questions GROUP BY kind")
+        else:
+            rows = conn.execute("SELECT kind, COUNT(*) FROM questions WHERE instr(domain, ?) > 0 GROUP BY kind", (domain,))
+        counts = dict(rows)
+        domain_info: dict[str, str | int] = {kind: counts.get(kind, 0) for kind in [config.PHRASE, config.SENTENCE, config.MEANING]}
+        domain_info['all'] = sum(domain_info.values())
+        info.append({"domain": domain} | domain_info)
+    conn.close()
+    return info
+
+def run_scores(model_names: list[str]) -> list[dict[str, float | str | int]]:
+    """统计模型每次调用的分数，用于比较多次测试的结果
+
+    Args:
+        model_names (list[str]): 模型名称
+
+    Returns:
+        list[dict[str, float | str | int]]: 每次调用的分数
+    """
+    conn = connect()
+    rows = conn.execute(
+        f"""
+        SELECT runs.run_id, runs.model, runs.created, extractions.kind, AVG(extractions.correct), COUNT(*), COUNT(DISTINCT extractions.permutation)
+        FROM runs JOIN extractions ON runs.run_id = extractions.run_id
+        WHERE runs.model IN ({', '.join('?' * len(model_names))})
+        GROUP BY runs.run_id, extractions.kind
+        ORDER BY runs.model, runs.run_id
+        """,
+        model_names,
+    )
+    records: dict[int, dict[str, float | str | int]] = {}
+    for run_id, model, created, kind, score, count, permutations in rows:
+        record = records.setdefault(run_id, {"run_id": run_id, "model": model, "created": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(created)), "count": 0, "permutations": 0})
+        record["permutations"] = max(record["permutations"], permutations)
+        record[kind] = score
+        record["count"] += count
+    conn.close()
+    return list(records.values())
+
+def main(model_names: list[str] | None = None) -> None:
+    """主函数，将已有的questions.json和extracted中的结果导入数据库
+
+    Args:
+        model_names (list[str] | None, optional): 需要导入的模型，默认为config.MODEL_NAMES
+    """
+    if model_names is None:
+        model_names = config.MODEL_NAMES
+    with open(config.json_path, "r", encoding="utf8") as f:
+        save_questions(json.load(f))
+    for model_name in model_names:
+        extracted_file: Path = Path(config.extracted_dir) / f"{model_name}.json"
+        if not extracted_file.exists():
+            continue
+        with extracted_file.open("r", encoding="utf8") as f:
+            extracted: list[dict[str, Any]] = json.load(f)
+        # 重复导入相同的结果时不新建调用记录，只更新提取的答案
+        run_id = save_run(model_name, extracted, str(extracted_file))
+        save_extractions(model_name, extracted, run_id)
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,7 @@
 """
 
 import config
+import response_store
 from tqdm import tqdm
 import re
 from typing import Any
@@ -79,35 +80,48 @@ def model_results_extract(model_name: str) -> None:
     with json_file.open("r", encoding="utf8") as f:
         results: list[dict[str, Any]] = json.load(f)
     add_extracted: list[dict[str, Any]] = []
-    # 提取答案
-    for result in tqdm(results, desc=f"提取答案: {model_name}"):
-        add_extracted.append(
-            {
-                config.DOMAIN : result[config.DOMAIN],
-                config.ID : result[config.ID],
-                config.QUESTION : result[config.QUESTION],
-                config.OPTIONS : result[config.OPTIONS],
-                config.ANSWER : result[config.ANSWER],
-                config.EXTRACTED_ANSWER : answer_extract(result[config.RESPONSE]),
-                config.RESPONSE : result[config.RESPONSE],
-                config.TIME : result[config.TIME],
-                config.KIND : result[config.KIND],
-                config.QUESTION_INFO : result[config.QUESTION_INFO],
-            }
-        )
+    # 提取答案，每个模型只打开一次打包文件
+    with response_store.open_pack() as reader:
+        for result in tqdm(results, desc=f"提取答案: {model_name}"):
+            response: str = response_store.get_response(result, reader)
+            add_extracted.append(
+                {
+                    config.DOMAIN : result[config.DOMAIN],
+                    config.ID : result[config.ID],
+                    config.PERMUTATION : result.get(config.PERMUTATION, 0),
+                    config.QUESTION : result[config.QUESTION],
+                    config.OPTIONS : result[config.OPTIONS],
+                    config.ANSWER : result[config.ANSWER],
+                    config.EXTRACTED_ANSWER : answer_extract(response),
+                    config.RESPONSE_HASH : response_store.get_response_hash(result),
+                    config.TIME : result[config.TIME],
+                    config.KIND : result[config.KIND],
+                    config.QUESTION_INFO : result[config.QUESTION_INFO],
+                }
+            )
     # 保存结果
     extracted_file: Path = Path(config.extracted_dir) / f"{model_name}.json"
     with extracted_file.open("w", encoding="utf8") as f:
         json.dump(add_extracted, f, ensure_ascii=False, indent=4)
+    if config.use_database:
+        import database
+        database.save_extractions(model_name, add_extracted)
 
-def main() -> None:
+def main(model_names: list[str] | None = None) -> None:
     """主函数
+
+    Args:
+        model_names (list[str] | None, optional): 需要提取答案的模型，默认为config.MODEL_NAMES
     """
+    if model_names is None:
+        model_names = config.MODEL_NAMES
     # 创建进程池
     with concurrent.futures.ThreadPoolExecutor() as executor:
         # 多进程提取
-        for model in config.MODEL_NAMES:
-            executor.submit(model_results_extract, model)
+        futures = [executor.submit(model_results_extract, model) for model in model_names]
+        # 获取结果，使线程中的异常能够抛出
+        for future in futures:
+            future.result()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -2,32 +2,148 @@
 # date: 2025-01-24
 
 """程序入口文件
+
+各阶段的模块只在对应的子命令中导入，避免只重新提取答案或统计分数时也要加载pandas等库。
+
+用法示例：
+    python main.py                           # 不指定子命令时运行全部阶段
+    python main.py all                       # 运行全部阶段
+    python main.py questions                 # 读取excel文件生成问题
+    python main.py call -m gpt-4o            # 只调用指定模型的API
+    python main.py call -k 24                # 每个问题使用24种选项排列调用API
+    python main.py extract                   # 提取答案
+    python main.py score -m deepseek-chat    # 在终端输出模型分数，不写excel
+    python main.py bias                      # 在终端输出模型对选项字母的偏好
+    python main.py postprocess               # 统计结果并写入excel
+    python main.py migrate                   # 将旧结果中的回复文本转存到回复存储中
+    python main.py db-import                 # 将已有的问题和提取结果导入数据库
+    python main.py runs                      # 比较数据库中每次调用的分数
 """
 
-import xlsx2json
-import callapi
-import extract
-import postprocess
+import argparse
+import sys
 import time
+import config
 
-def main():
-    # 读取excel文件生成问题
-    time_start = time.time()
-    print("测试开始！")
+def run_questions(args: argparse.Namespace) -> None:
+    """读取excel文件生成问题
+    """
+    import xlsx2json
     print("读取excel文件生成问题...")
     xlsx2json.main()
-    # 调用API获取结果
+
+def run_call(args: argparse.Namespace) -> None:
+    """调用API获取结果
+    """
+    import callapi
     print("调用API获取结果...")
-    callapi.main()
-    # 提取结果
+    callapi.main(args.models, args.permutations)
+
+def run_extract(args: argparse.Namespace) -> None:
+    """提取结果
+    """
+    import extract
     print("提取结果...")
-    extract.main()
-    # 后处理
+    extract.main(args.models)
+
+def run_score(args: argparse.Namespace) -> None:
+    """在终端输出模型分数
+    """
+    import postprocess
+    postprocess.print_scores(args.models)
+
+def run_bias(args: argparse.Namespace) -> None:
+    """在终端输出模型对选项字母的偏好
+    """
+    import postprocess
+    postprocess.print_bias(args.models)
+
+def run_postprocess(args: argparse.Namespace) -> None:
+    """进行结果的统计和后处理
+    """
+    import postprocess
     print("进行结果的统计和后处理...")
-    postprocess.main()
+    postprocess.main(args.models)
+
+def run_migrate(args: argparse.Namespace) -> None:
+    """将旧结果中的回复文本转存到回复存储中
+    """
+    import response_store
+    print("迁移模型回复...")
+    response_store.main(args.models)
+
+def run_db_import(args: argparse.Namespace) -> None:
+    """将已有的问题和提取结果导入数据库
+    """
+    import database
+    print("导入数据库...")
+    database.main(args.models)
+
+def run_runs(args: argparse.Namespace) -> None:
+    """在终端输出数据库中每次调用的分数
+    """
+    import postprocess
+    postprocess.print_runs(args.models)
+
+def run_all(args: argparse.Namespace) -> None:
+    """依次运行全部阶段
+    """
+    run_questions(args)
+    run_call(args)
+    run_extract(args)
+    run_postprocess(args)
+
+def get_parser() -> argparse.ArgumentParser:
+    """构建命令行参数解析器
+
+    Returns:
+        argparse.ArgumentParser: 参数解析器
+    """
+    # 各子命令共用的模型筛选参数
+    model_parser = argparse.ArgumentParser(add_help=False)
+    model_parser.add_argument(
+        "-m", "--models", nargs="+", choices=config.MODEL_NAMES, default=config.MODEL_NAMES,
+        help="需要处理的模型，默认为config.MODEL_NAMES中的全部模型",
+    )
+    parser = argparse.ArgumentParser(description="“上来”测试题的大模型测试程序")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    commands = [
+        ("all", run_all, "运行全部阶段"),
+        ("questions", run_questions, "读取excel文件生成问题"),
+        ("call", run_call, "调用API获取结果"),
+        ("extract", run_extract, "从API结果中提取答案"),
+        ("score", run_score, "在终端输出模型分数"),
+        ("bias", run_bias, "在终端输出模型对选项字母的偏好"),
+        ("postprocess", run_postprocess, "统计结果并写入excel文件"),
+        ("migrate", run_migrate, "将旧结果中的回复文本转存到回复存储中"),
+        ("db-import", run_db_import, "将已有的问题和提取结果导入数据库"),
+        ("runs", run_runs, "在终端输出数据库中每次调用的分数"),
+    ]
+    for name, func, help_text in commands:
+        subparser = subparsers.add_parser(name, parents=[model_parser], help=help_text)
+        subparser.set_defaults(func=func)
+        # 调用API的子命令可以扩充选项排列
+        if name in ["all", "call"]:
+            subparser.add_argument(
+                "-k", "--permutations", type=int, default=config.permutations,
+                help="每个问题的选项排列数，默认为config.permutations",
+            )
+    return parser
+
+def main(argv: list[str] | None = None) -> None:
+    if argv is None:
+        argv = sys.argv[1:]
+    # 不指定子命令时与原来一样运行全部阶段
+    if not argv:
+        argv = ["all"]
+    parser = get_parser()
+    args = parser.parse_args(argv)
+    time_start = time.time()
+    print("测试开始！")
+    args.func(args)
     print("测试结束！")
     time_end = time.time()
     print("总共用时：", time_end - time_start, "秒")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
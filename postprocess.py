@@ -2,16 +2,22 @@
 # date: 2025-01-23
 
 """对模型的结果进行后处理，计算模型的分数和时间
+
+pandas只在生成表格时导入，只计算分数时不需要加载pandas。
 """
 
+from __future__ import annotations
 import config
-import pandas as pd
+import response_store
 from pathlib import Path
-from typing import Any
+from typing import Any, TYPE_CHECKING
 import json
 import statistics
 import concurrent.futures
 
+if TYPE_CHECKING:
+    import pandas as pd
+
 def compare_lists(standard: list[str], outputs: list[str]) -> bool:
     """比较两个列表是否相同
 
@@ -31,86 +37,231 @@ def compare_lists(standard: list[str], outputs: list[str]) -> bool:
             return False
     return True
 
-def model_score(model_name: str) -> dict[str, float | str]:
+def load_results(model_name: str) -> list[dict[str, Any]]:
+    """读取模型的提取结果
+
+    Args:
+        model_name (str): 模型的名字
+
+    Returns:
+        list[dict[str, Any]]: 提取结果
+    """
+    result_file: Path = Path(config.extracted_dir) / f"{model_name}.json"
+    with result_file.open("r", encoding="utf8") as f:
+        return json.load(f)
+
+def has_permutations(results: list[dict[str, Any]]) -> bool:
+    """判断结果中是否包含扩充的选项排列
+
+    Args:
+        results (list[dict[str, Any]]): 提取结果
+
+    Returns:
+        bool: 是否包含扩充的选项排列
+    """
+    return any(i.get(config.PERMUTATION, 0) > 0 for i in results)
+
+def model_score(model_name: str, results: list[dict[str, Any]] | None = None) -> dict[str, float | str]:
     """计算模型的分数
 
     Args:
         model_name (str): 模型的名字
+        results (list[dict[str, Any]] | None, optional): 已读取的提取结果，默认读取extracted中的文件
 
     Returns:
         dict[str, float | str]: 模型的分数
     """
+    if config.use_database:
+        import database
+        # 已读取结果时，统计与结果对应的调用，否则统计最近一次调用
+        run_id = None if results is None else database.matching_run(model_name, results)
+        return database.model_score(model_name, run_id)
     record: dict[str, float | str] = {"model": model_name}
-    result_file: Path = Path(config.extracted_dir) / f"{model_name}.json"
-    with result_file.open("r", encoding="utf8") as f:
-        results: list[dict[str, Any]] = json.load(f)
+    if results is None:
+        results = load_results(model_name)
+    # 扩充选项排列时，分数为所有排列的平均值
+    record['permutations'] = len({i.get(config.PERMUTATION, 0) for i in results})
     be_correct = [compare_lists(i[config.ANSWER], i[config.EXTRACTED_ANSWER]) for i in results]
     record['all'] = sum(be_correct) / len(be_correct)
     for kind in [config.PHRASE, config.SENTENCE, config.MEANING]:
         certain_kind = [i for i in results if i[config.KIND] == kind]
         be_correct = [compare_lists(i[config.ANSWER], i[config.EXTRACTED_ANSWER]) for i in certain_kind]
         record[kind] = sum(be_correct) / len(be_correct)
-    for domain in [config.pre_phrase, config.middle_phrase, config.post_phrase, "NV上来"]:
+    for domain in config.domain_forms:
         certain_domain = [i for i in results if domain in i[config.DOMAIN]]
         be_correct = [compare_lists(i[config.ANSWER], i[config.EXTRACTED_ANSWER]) for i in certain_domain]
         record[domain] = sum(be_correct) / len(be_correct)
     return record
 
-def model_time(model_name: str) -> dict[str, float | str]:
+def model_time(model_name: str, results: list[dict[str, Any]] | None = None) -> dict[str, float | str]:
     """计算模型的时间
 
     Args:
         model_name (str): 模型的名字
+        results (list[dict[str, Any]] | None, optional): 已读取的提取结果，默认读取extracted中的文件
 
     Returns:
         dict[str, float | str]: 模型的时间
     """
+    if config.use_database:
+        import database
+        # 已读取结果时，统计与结果对应的调用，否则统计最近一次调用
+        run_id = None if results is None else database.matching_run(model_name, results)
+        return database.model_time(model_name, run_id)
     record: dict[str, str|float] = {"model": model_name}
-    result_file: Path = Path(config.extracted_dir) / f"{model_name}.json"
-    with result_file.open("r", encoding="utf8") as f:
-        results: list[dict[str, Any]] = json.load(f)
+    if results is None:
+        results = load_results(model_name)
     record['all'] = statistics.mean([i[config.TIME] for i in results])
     for kind in [config.PHRASE, config.SENTENCE, config.MEANING]:
         certain_kind = [i for i in results if i[config.KIND] == kind]
         record[kind] = statistics.mean([i[config.TIME] for i in certain_kind])
     return record
 
-def json2dataframe(model_name: str) -> pd.DataFrame:
+def info_scores(model_name: str, results: list[dict[str, Any]] | None = None) -> list[dict[str, float | str | int]]:
+    """按照问题信息（动词、动词类型、名词角色、名词类型）统计模型的分数
+
+    Args:
+        model_name (str): 模型的名字
+        results (list[dict[str, Any]] | None, optional): 已读取的提取结果，默认读取extracted中的文件
+
+    Returns:
+        list[dict[str, float | str | int]]: 每个问题信息取值的分数
+    """
+    if config.use_database:
+        import database
+        # 已读取结果时，统计与结果对应的调用，否则统计最近一次调用
+        run_id = None if results is None else database.matching_run(model_name, results)
+        return database.info_scores(model_name, run_id)
+    if results is None:
+        results = load_results(model_name)
+    records: list[dict[str, float | str | int]] = []
+    for field in [config.verb, config.verb_type, config.noun_role, config.noun_type]:
+        groups: dict[str, list[bool]] = {}
+        for i in results:
+            groups.setdefault(i[config.QUESTION_INFO][field], []).append(compare_lists(i[config.ANSWER], i[config.EXTRACTED_ANSWER]))
+        for value in sorted(groups):
+            be_correct = groups[value]
+            records.append({"model": model_name, "field": field, "value": value, "count": len(be_correct), "score": sum(be_correct) / len(be_correct)})
+    return records
+
+def choice_rates(model_name: str, label: str, results: list[dict[str, Any]], letters: list[str]) -> dict[str, float | str | int]:
+    """统计某个选项被选择的比例和为正确答案的比例
+
+    Args:
+        model_name (str): 模型的名字
+        label (str): 统计结果的标签
+        results (list[dict[str, Any]]): 提取结果
+        letters (list[str]): 每条结果中需要统计的选项字母
+
+    Returns:
+        dict[str, float | str | int]: 统计结果
+    """
+    chosen: float = sum(letter in i[config.EXTRACTED_ANSWER] for i, letter in zip(results, letters)) / len(results)
+    answer: float = sum(letter in i[config.ANSWER] for i, letter in zip(results, letters)) / len(results)
+    return {
+        "model": model_name,
+        "letter": label,
+        "count": len(results),
+        "chosen": chosen,
+        config.ANSWER: answer,
+        "bias": chosen - answer,
+    }
+
+def letter_bias(model_name: str, results: list[dict[str, Any]] | None = None) -> list[dict[str, float | str | int]]:
+    """统计模型对各选项字母的偏好
+
+    对每个选项字母，比较模型选择该字母的比例和该字母为正确答案的比例，差值为正说明模型偏好该位置。
+    “以上选项均不满足题意”始终位于最后，不参与字母的统计，作为单独的一行输出。
+    使用augment扩充选项排列后的结果时，各位置上的正确答案分布更均匀，统计更可靠。
+
+    Args:
+        model_name (str): 模型的名字
+        results (list[dict[str, Any]] | None, optional): 已读取的提取结果，默认读取extracted中的文件
+
+    Returns:
+        list[dict[str, float | str | int]]: 每个字母的统计结果
+    """
+    if results is None:
+        results = load_results(model_name)
+    letters: list[str] = sorted({letter for i in results for letter, option in i[config.OPTIONS].items() if option != config.not_satisfy})
+    records: list[dict[str, float | str | int]] = []
+    for letter in letters:
+        # 只统计参与排列的选项，“以上选项均不满足题意”单独统计
+        certain_letter = [i for i in results if i[config.OPTIONS].get(letter, config.not_satisfy) != config.not_satisfy]
+        records.append(choice_rates(model_name, letter, certain_letter, [letter] * len(certain_letter)))
+    certain_none = [i for i in results if config.not_satisfy in i[config.OPTIONS].values()]
+    none_letters = [next(k for k, v in i[config.OPTIONS].items() if v == config.not_satisfy) for i in certain_none]
+    if certain_none:
+        records.append(choice_rates(model_name, config.not_satisfy, certain_none, none_letters))
+    return records
+
+def permutation_consistency(model_name: str, results: list[dict[str, Any]] | None = None) -> dict[str, float | str]:
+    """统计模型在同一问题的不同选项排列下的表现
+
+    Args:
+        model_name (str): 模型的名字
+        results (list[dict[str, Any]] | None, optional): 已读取的提取结果，默认读取extracted中的文件
+
+    Returns:
+        dict[str, float | str]: 所有排列都答对的问题比例和答对的排列比例的平均值
+    """
+    if results is None:
+        results = load_results(model_name)
+    # 按原始问题分组
+    groups: dict[tuple[str, str, int], list[bool]] = {}
+    for i in results:
+        key = (i[config.DOMAIN], i[config.KIND], i[config.ID])
+        groups.setdefault(key, []).append(compare_lists(i[config.ANSWER], i[config.EXTRACTED_ANSWER]))
+    return {
+        "model": model_name,
+        "all_correct": float(statistics.mean([all(v) for v in groups.values()])),
+        "mean_correct": float(statistics.mean([sum(v) / len(v) for v in groups.values()])),
+    }
+
+def json2dataframe(model_name: str, results: list[dict[str, Any]] | None = None) -> pd.DataFrame:
     """将json文件转换为dataframe
 
     Args:
         model_name (str): 模型的名字
+        results (list[dict[str, Any]] | None, optional): 已读取的提取结果，默认读取extracted中的文件
 
     Returns:
         pd.DataFrame: dataframe
     """
-    result_file: Path = Path(config.extracted_dir) / f"{model_name}.json"
-    with result_file.open("r", encoding="utf8") as f:
-        results: list[dict[str, Any]] = json.load(f)
+    import pandas as pd
+    if results is None:
+        results = load_results(model_name)
     transformed = []
-    for result in results:
-        transformed.append({
-            config.DOMAIN: result[config.DOMAIN],
-            config.ID: result[config.ID],
-            config.QUESTION: result[config.QUESTION],
-        } | result[config.OPTIONS] |
-        {
-            config.ANSWER: ";".join(result[config.ANSWER]),
-            config.EXTRACTED_ANSWER: ";".join([str(i) for i in result[config.EXTRACTED_ANSWER]]),
-            config.JUDGE: compare_lists(result[config.ANSWER], result[config.EXTRACTED_ANSWER]),
-            config.TIME: result[config.TIME],
-            config.KIND: result[config.KIND], 
-        } | result[config.QUESTION_INFO] | 
-        {
-            config.RESPONSE: result[config.RESPONSE],
-        })
+    # 打开一次打包文件，读取所有回复
+    with response_store.open_pack() as reader:
+        for result in results:
+            transformed.append({
+                config.DOMAIN: result[config.DOMAIN],
+                config.ID: result[config.ID],
+                config.PERMUTATION: result.get(config.PERMUTATION, 0),
+                config.QUESTION: result[config.QUESTION],
+            } | result[config.OPTIONS] |
+            {
+                config.ANSWER: ";".join(result[config.ANSWER]),
+                config.EXTRACTED_ANSWER: ";".join([str(i) for i in result[config.EXTRACTED_ANSWER]]),
+                config.JUDGE: compare_lists(result[config.ANSWER], result[config.EXTRACTED_ANSWER]),
+                config.TIME: result[config.TIME],
+                config.KIND: result[config.KIND], 
+            } | result[config.QUESTION_INFO] | 
+            {
+                config.RESPONSE: response_store.get_response(result, reader),
+            })
     return pd.DataFrame(transformed)
 
 def basic_info() -> pd.DataFrame:
+    import pandas as pd
+    if config.use_database:
+        import database
+        return pd.DataFrame(database.question_counts())
     with open(config.json_path, "r", encoding="utf8") as f:
         questions: list[dict[str, Any]] = json.load(f)
     info: list[dict[str, str|int]] = []
-    for domain in [config.pre_phrase, config.middle_phrase, config.post_phrase, "NV上来"]:
+    for domain in config.domain_forms:
         domain_info: dict[str, str|int] = {}
         for kind in [config.PHRASE, config.SENTENCE, config.MEANING]:
             certain_question = [i for i in questions if domain in i[config.DOMAIN] and i[config.KIND] == kind]
@@ -128,25 +279,89 @@ def basic_info() -> pd.DataFrame:
     info.append(info_all)
     return pd.DataFrame(info)
 
-def main():
+def format_record(record: dict[str, Any]) -> str:
+    """将统计结果格式化为一行文本，用于在终端输出
+
+    Args:
+        record (dict[str, Any]): 统计结果
+
+    Returns:
+        str: 格式化后的文本
+    """
+    return "\t".join(f"{k}: {v:.4f}" if isinstance(v, float) else f"{k}: {v}" for k, v in record.items())
+
+def print_scores(model_names: list[str] | None = None) -> None:
+    """在终端输出模型的分数，不生成excel文件
+
+    Args:
+        model_names (list[str] | None, optional): 需要统计的模型，默认为config.MODEL_NAMES
+    """
+    if model_names is None:
+        model_names = config.MODEL_NAMES
+    for model in model_names:
+        record = model_score(model)
+        print(format_record(record))
+
+def print_runs(model_names: list[str] | None = None) -> None:
+    """在终端输出数据库中模型每次调用的分数
+
+    Args:
+        model_names (list[str] | None, optional): 需要统计的模型，默认为config.MODEL_NAMES
+    """
+    import database
+    if model_names is None:
+        model_names = config.MODEL_NAMES
+    for record in database.run_scores(model_names):
+        print(format_record(record))
+
+def print_bias(model_names: list[str] | None = None) -> None:
+    """在终端输出模型对各选项字母的偏好
+
+    Args:
+        model_names (list[str] | None, optional): 需要统计的模型，默认为config.MODEL_NAMES
+    """
+    if model_names is None:
+        model_names = config.MODEL_NAMES
+    for model in model_names:
+        results = load_results(model)
+        for record in letter_bias(model, results):
+            print(format_record(record))
+        # 没有扩充选项排列时，一致性与正确率相同，不输出
+        if has_permutations(results):
+            print(format_record(permutation_consistency(model, results)))
+
+def main(model_names: list[str] | None = None) -> None:
     """主函数
+
+    Args:
+        model_names (list[str] | None, optional): 需要统计的模型，默认为config.MODEL_NAMES
     """
+    import pandas as pd
+    if model_names is None:
+        model_names = config.MODEL_NAMES
     writer = pd.ExcelWriter(config.RESULT_FILE)
     basic_info().to_excel(writer, sheet_name="基础信息", index=False)
-    score_result: list[dict[str, str|float]] = []
-    time_result: list[dict[str, str|float]] = []
+    # 每个模型的提取结果只读取一次
+    # 使用数据库时，分数、耗时和分类分数在数据库中与这些结果对应的调用上统计，保证各个sheet来自同一次调用
+    results_dict: dict[str, list[dict[str, Any]]] = {}
     with concurrent.futures.ThreadPoolExecutor() as executor:
-        for model in config.MODEL_NAMES:
-            curr_score = executor.submit(model_score, model)
-            score_result.append(curr_score.result())
-            curr_time = executor.submit(model_time, model)
-            time_result.append(curr_time.result())
-    score_df = pd.DataFrame(score_result)
-    time_df = pd.DataFrame(time_result)
+        for model, results in zip(model_names, executor.map(load_results, model_names)):
+            results_dict[model] = results
+    score_df = pd.DataFrame([model_score(model, results_dict[model]) for model in model_names])
+    time_df = pd.DataFrame([model_time(model, results_dict[model]) for model in model_names])
     score_df.to_excel(writer, sheet_name="模型分数", index=False)
     time_df.to_excel(writer, sheet_name="模型耗时", index=False)
-    for model in config.MODEL_NAMES:
-        df = json2dataframe(model)
+    info_df = pd.DataFrame([record for model in model_names for record in info_scores(model, results_dict[model])])
+    info_df.to_excel(writer, sheet_name="分类分数", index=False)
+    bias_df = pd.DataFrame([record for model in model_names for record in letter_bias(model, results_dict[model])])
+    bias_df.to_excel(writer, sheet_name="选项偏好", index=False)
+    # 没有扩充选项排列时，一致性与正确率相同，不输出
+    permuted = [model for model in model_names if has_permutations(results_dict[model])]
+    if permuted:
+        consistency_df = pd.DataFrame([permutation_consistency(model, results_dict[model]) for model in permuted])
+        consistency_df.to_excel(writer, sheet_name="排列一致性", index=False)
+    for model in model_names:
+        df = json2dataframe(model, results_dict[model])
         df.to_excel(writer, sheet_name=model, index=False)
     writer.close()
 
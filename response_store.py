@@ -0,0 +1,175 @@
+# encoding: utf8
+# date: 2025-02-10
+
+"""模型回复的存储
+
+每条模型回复按照内容的sha256值压缩后追加保存到一个打包文件中，相同的回复只保存一次，
+索引文件记录每条回复在打包文件中的位置。result和extracted中的记录只保存回复的哈希值，
+需要回复文本时再读取。
+"""
+
+import config
+import json
+import hashlib
+import threading
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, BinaryIO, Iterator
+
+# 打包文件和索引文件的名称
+PACK_FILE = "responses.pack"
+INDEX_FILE = "responses.index"
+
+# 索引：哈希值 -> (偏移量, 长度)，首次使用时读取
+_index: dict[str, tuple[int, int]] | None = None
+# callapi和extract使用多线程，读取索引和写入打包文件时需要加锁
+_lock = threading.Lock()
+
+def _load_index() -> dict[str, tuple[int, int]]:
+    """读取索引文件
+
+    Returns:
+        dict[str, tuple[int, int]]: 哈希值到偏移量和长度的映射
+    """
+    global _index
+    if _index is None:
+        index: dict[str, tuple[int, int]] = {}
+        index_path = Path(config.response_dir) / INDEX_FILE
+        if index_path.exists():
+            with index_path.open("r", encoding="utf8") as f:
+                for line in f:
+                    response_hash, offset, length = line.split()
+                    index[response_hash] = (int(offset), int(length))
+        # 读取完成后再赋值，其他线程不加锁读取_index时不会看到不完整的索引
+        _index = index
+    return _index
+
+def save_response(response: str) -> str:
+    """保存回复文本，相同的回复只保存一次
+
+    Args:
+        response (str): 回复文本
+
+    Returns:
+        str: 回复的哈希值
+    """
+    data: bytes = response.encode("utf8")
+    response_hash: str = hashlib.sha256(data).hexdigest()
+    with _lock:
+        index = _load_index()
+        if response_hash in index:
+            return response_hash
+        compressed: bytes = zlib.compress(data, 9)
+        response_dir = Path(config.response_dir)
+        response_dir.mkdir(parents=True, exist_ok=True)
+        # 先写入打包文件再写入索引，中断时最多留下未被索引的数据
+        with (response_dir / PACK_FILE).open("ab") as f:
+            offset: int = f.tell()
+            f.write(compressed)
+        with (response_dir / INDEX_FILE).open("a", encoding="utf8") as f:
+            f.write(f"{response_hash}\t{offset}\t{len(compressed)}\n")
+        index[response_hash] = (offset, len(compressed))
+    return response_hash
+
+@contextmanager
+def open_pack() -> Iterator[BinaryIO | None]:
+    """打开打包文件用于读取，读取多条回复时共用同一个句柄
+
+    Yields:
+        Iterator[BinaryIO | None]: 读取句柄，打包文件不存在时为None
+    """
+    pack_path = Path(config.response_dir) / PACK_FILE
+    if not pack_path.exists():
+        yield None
+        return
+    with pack_path.open("rb") as reader:
+        yield reader
+
+def load_response(response_hash: str, reader: BinaryIO | None = None) -> str:
+    """读取回复文本
+
+    Args:
+        response_hash (str): 回复的哈希值
+        reader (BinaryIO | None, optional): open_pack打开的读取句柄，默认为本次读取单独打开打包文件
+
+    Returns:
+        str: 回复文本
+    """
+    # 索引只会增加条目，读取时只在首次读取索引时加锁
+    index = _index
+    if index is None:
+        with _lock:
+            index = _load_index()
+    offset, length = index[response_hash]
+    if reader is None:
+        with open_pack() as pack:
+            return load_response(response_hash, pack)
+    reader.seek(offset)
+    compressed: bytes = reader.read(length)
+    return zlib.decompress(compressed).decode("utf8")
+
+def get_response(record: dict[str, Any], reader: BinaryIO | None = None) -> str:
+    """获得记录对应的回复文本，兼容直接保存回复文本的旧记录
+
+    Args:
+        record (dict[str, Any]): result或extracted中的记录
+        reader (BinaryIO | None, optional): open_pack打开的读取句柄
+
+    Returns:
+        str: 回复文本
+    """
+    if config.RESPONSE in record:
+        return record[config.RESPONSE]
+    return load_response(record[config.RESPONSE_HASH], reader)
+
+def get_response_hash(record: dict[str, Any]) -> str:
+    """获得记录对应的回复哈希值，旧记录的回复文本会被写入存储
+
+    Args:
+        record (dict[str, Any]): result或extracted中的记录
+
+    Returns:
+        str: 回复的哈希值
+    """
+    if config.RESPONSE_HASH in record:
+        return record[config.RESPONSE_HASH]
+    return save_response(record[config.RESPONSE])
+
+def migrate_file(json_file: Path) -> None:
+    """将旧的json文件中的回复文本转存，并替换为哈希值
+
+    Args:
+        json_file (Path): json文件路径
+    """
+    if not json_file.exists():
+        return
+    with json_file.open("r", encoding="utf8") as f:
+        records: list[dict[str, Any]] = json.load(f)
+    migrated: list[dict[str, Any]] = []
+    for record in records:
+        if config.RESPONSE not in record:
+            migrated.append(record)
+            continue
+        # 保持字段顺序，将回复文本替换为哈希值
+        migrated.append({
+            (config.RESPONSE_HASH if k == config.RESPONSE else k): (save_response(v) if k == config.RESPONSE else v)
+            for k, v in record.items()
+        })
+    with json_file.open("w", encoding="utf8") as f:
+        json.dump(migrated, f, ensure_ascii=False, indent=4)
+
+def main(model_names: list[str] | None = None) -> None:
+    """主函数，迁移result和extracted中的旧结果
+
+    Args:
+        model_names (list[str] | None, optional): 需要迁移的模型，默认为config.MODEL_NAMES
+    """
+    if model_names is None:
+        model_names = config.MODEL_NAMES
+    for model_name in model_names:
+        migrate_file(Path(config.res_dir) / f"{model_name}.json")
+        migrate_file(Path(config.extracted_dir) / f"{model_name}.json")
+
+if __name__ == "__main__":
+    main()
@@ -182,6 +182,9 @@ def main() -> None:
     # 保存结果
     with open(config.json_path, 'w', encoding='utf8') as f:
         json.dump(result, f, ensure_ascii=False, indent=4)
+    if config.use_database:
+        import database
+        database.save_questions(result)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file